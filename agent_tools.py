@@ -1,17 +1,32 @@
 # agent_tools.py
 # 这是一个为 OSS-Fuzz 错误复现 Agent 提供核心功能的工具箱。
 
+import atexit
+import csv
+import difflib
+import errno
+import functools
+import json
 import os
+import re
 import shutil
+import sqlite3
+import stat
 import subprocess
 import tempfile
 import time
+from bisect import bisect_left
 from collections import deque
-from datetime import datetime
-from typing import Dict, List, Tuple, Optional
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from datetime import date, datetime, timedelta
+from itertools import pairwise
+from typing import Dict, List, NamedTuple, Tuple, Optional
 import openpyxl
 from openpyxl import Workbook
 
+from fuzz_build_worker import RESULT_MARKER as BUILD_RESULT_MARKER
+
 # Selenium 用于浏览器自动化，与腾讯文档交互
 from selenium import webdriver
 from selenium.common.exceptions import TimeoutException, WebDriverException
@@ -23,70 +38,319 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 
 
+# 记录已处理日志的索引文件，位于日志根目录下
+PROCESSED_DB_NAME = "processed.sqlite"
+# 待处理的错误日志文件名：包含 "error"，且不以 '+' 开头（旧版本通过加 '+' 前缀标记已处理的日志）
+_LOG_RE = re.compile(r'(?!\+).*error')
+# 按日期探测日志文件时，连续多少天未命中后改为完整列出项目目录
+PROBE_MAX_MISSES = 30
+# 逐个探测的天数，超出部分的窗口才并发探测
+PROBE_SEQUENTIAL_DAYS = 3
+# 并发探测日志文件时的最大线程数
+PROBE_MAX_WORKERS = 16
+
+
+def _open_processed_db(logs_directory: str) -> sqlite3.Connection:
+    """
+    打开（必要时创建）日志根目录下的已处理日志索引。
+    processed 表记录已处理的日志路径；last_processed 表记录每个项目最近处理的日志日期；
+    listed_projects 表记录项目目录被完整列出且全部处理完毕时的 mtime；
+    log_sha 表在文件系统不支持扩展属性时缓存日志对应的 commit SHA。
+    """
+    conn = sqlite3.connect(os.path.join(logs_directory, PROCESSED_DB_NAME))
+    conn.execute("CREATE TABLE IF NOT EXISTS processed (path TEXT PRIMARY KEY)")
+    conn.execute("CREATE TABLE IF NOT EXISTS last_processed (project TEXT PRIMARY KEY, log_date TEXT)")
+    conn.execute("CREATE TABLE IF NOT EXISTS listed_projects (project TEXT PRIMARY KEY, dir_mtime_ns INTEGER)")
+    conn.execute("CREATE TABLE IF NOT EXISTS log_sha (path TEXT PRIMARY KEY, sha TEXT, commits_key TEXT)")
+    return conn
+
+
+def _log_date(log_filename: str) -> Optional[date]:
+    """从 "YYYY_M_D error.txt" 形式的文件名中解析日期，不符合格式时返回 None。"""
+    try:
+        year, month, day = log_filename.split(' ')[0].split('_')
+        return date(int(year), int(month), int(day))
+    except ValueError:
+        return None
+
+
+def _log_candidates(log_date: date) -> Tuple[str, str]:
+    """返回某一天可能存在的错误日志文件名。"""
+    date_string = f"{log_date.year}_{log_date.month}_{log_date.day}"
+    return f"{date_string} error.txt", f"{date_string} error"
+
+
+def _is_regular_file(path: str) -> bool:
+    """os.stat 探测路径是否为普通文件，不存在或无法访问时返回 False。"""
+    try:
+        return stat.S_ISREG(os.stat(path).st_mode)
+    except OSError:
+        return False
+
+
+# 并发执行日志探测的线程池：os.stat 会释放 GIL，在网络文件系统上可把多次往返重叠为一次
+_probe_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_probe_executor() -> ThreadPoolExecutor:
+    """返回探测用的线程池，首次使用时才创建。"""
+    global _probe_executor
+    if _probe_executor is None:
+        _probe_executor = ThreadPoolExecutor(max_workers=PROBE_MAX_WORKERS)
+    return _probe_executor
+
+
+class _LogQueue:
+    """
+    待处理错误日志的内存队列。
+    只在首次使用（或调用 refresh）时读取一次已处理索引并列出项目目录，之后
+    get_next_error_log 直接读取队首，mark_processed 负责把已处理的日志写入索引并移出队列。
+
+    项目目录的 mtime 与上次完整列出并处理完毕时相同，说明没有新日志，直接跳过该项目。
+    否则对已有处理记录的项目，先从最近处理的日志日期开始逐天 os.stat 探测下一个
+    日志文件名，命中则无需列出目录；探测未命中时再完整列出目录，
+    以免遗漏同一天的其他文件名、更早的日期或非标准命名的日志。
+    """
+
+    def __init__(self) -> None:
+        self.logs_directory: Optional[str] = None
+        self._projects: deque = deque()
+        self._entries: deque = deque()
+        # 本次运行中已完整列出的项目 -> 列出前的目录 mtime
+        self._listed: Dict[str, int] = {}
+        # 上次完整列出且全部处理完毕的项目 -> 当时的目录 mtime
+        self._listed_mtimes: Dict[str, int] = {}
+        self._processed: set = set()
+        self._last_dates: Dict[str, date] = {}
+
+    def refresh(self, logs_directory: Optional[str] = None) -> None:
+        """重新加载已处理索引并扫描日志目录，重建队列。可用于手动让缓存失效。"""
+        if logs_directory is not None:
+            self.logs_directory = os.path.abspath(logs_directory)
+        self._projects.clear()
+        self._entries.clear()
+        self._listed.clear()
+        self._listed_mtimes.clear()
+        self._processed.clear()
+        self._last_dates.clear()
+        if self.logs_directory is None:
+            return
+
+        with closing(_open_processed_db(self.logs_directory)) as conn:
+            self._processed.update(row[0] for row in conn.execute("SELECT path FROM processed"))
+            for project_name, log_date in conn.execute("SELECT project, log_date FROM last_processed"):
+                self._last_dates[project_name] = date.fromisoformat(log_date)
+            for project_name, dir_mtime_ns in conn.execute("SELECT project, dir_mtime_ns FROM listed_projects"):
+                self._listed_mtimes[project_name] = dir_mtime_ns
+
+        # DirEntry 自带 getdents 返回的文件类型，is_dir/is_file 无需额外的 stat 调用
+        with os.scandir(self.logs_directory) as it:
+            self._projects.extend(sorted((e for e in it if e.is_dir(follow_symlinks=False)), key=lambda e: e.name))
+
+    def _probe_next_log(self, project_entry: os.DirEntry) -> Optional[str]:
+        """
+        探测项目最近处理的日志日期当天（同一天的另一种文件名）及之后
+        （最多 PROBE_MAX_MISSES 天，且不超过今天）的日志文件是否存在。
+        前 PROBE_SEQUENTIAL_DAYS 天逐个 stat，命中即返回；窗口剩余部分的 stat 一次性
+        并发提交，返回日期最早的命中。没有处理记录或未命中时返回 None。
+        """
+        project_name = project_entry.name
+        last_date = self._last_dates.get(project_name)
+        if last_date is None:
+            return None
+
+        today = date.today()
+        sequential_candidates: List[str] = []
+        candidates: List[str] = []
+        for offset in range(PROBE_MAX_MISSES):
+            probe_date = last_date + timedelta(days=offset)
+            if probe_date > today:
+                break
+            (sequential_candidates if offset < PROBE_SEQUENTIAL_DAYS else candidates).extend(
+                log_filename for log_filename in _log_candidates(probe_date)
+                if os.path.join(project_name, log_filename) not in self._processed
+            )
+
+        # 最常见的情况是下一个日志就在最近几天内（窗口不足 PROBE_SEQUENTIAL_DAYS 天时也是如此），
+        # 逐个探测，命中即停止，无需动用线程池
+        for log_filename in sequential_candidates:
+            if _is_regular_file(os.path.join(project_entry.path, log_filename)):
+                return log_filename
+
+        if not candidates:
+            return None
+        candidate_paths = [os.path.join(project_entry.path, log_filename) for log_filename in candidates]
+        for log_filename, exists in zip(candidates, _get_probe_executor().map(_is_regular_file, candidate_paths)):
+            if exists:
+                return log_filename
+        return None
+
+    def _list_pending_logs(self, project_entry: os.DirEntry) -> List[str]:
+        """列出项目目录中所有未处理的错误日志，按日期排序。"""
+        project_name = project_entry.name
+        try:
+            with os.scandir(project_entry.path) as it:
+                pending_logs = [
+                    e.name for e in it
+                    # 跳过索引中已记录为已处理的日志；与 os.stat 探测一致，跟随符号链接
+                    if _LOG_RE.match(e.name) and e.is_file()
+                    and os.path.join(project_name, e.name) not in self._processed
+                ]
+        except OSError:
+            return []
+
+        # 按日期而非字符串排序（"2025_10_1" 在 "2025_9_3" 之后），保证 last_processed 单调递增
+        return sorted(pending_logs, key=lambda name: (_log_date(name) or date.min, name))
+
+    def peek(self) -> Optional[Tuple[str, str]]:
+        """返回队首的 (项目名, 文件名)，队列为空时返回 None。"""
+        while not self._entries and self._projects:
+            project_entry = self._projects[0]
+            project_name = project_entry.name
+            if project_name in self._listed:
+                # 该项目已完整列出且全部处理完毕，记录列出时的目录 mtime
+                self._save_listed_mtime(project_name, self._listed[project_name])
+                self._projects.popleft()
+                continue
+
+            try:
+                dir_mtime_ns = os.stat(project_entry.path).st_mtime_ns
+            except OSError:
+                self._projects.popleft()
+                continue
+            if self._listed_mtimes.get(project_name) == dir_mtime_ns:
+                # 目录自上次完整处理后没有变化，不会有新的日志
+                self._projects.popleft()
+                continue
+
+            log_filename = self._probe_next_log(project_entry)
+            if log_filename is not None:
+                self._entries.append((project_name, log_filename))
+            else:
+                self._entries.extend((project_name, name) for name in self._list_pending_logs(project_entry))
+                self._listed[project_name] = dir_mtime_ns
+
+        return self._entries[0] if self._entries else None
+
+    def _save_listed_mtime(self, project_name: str, dir_mtime_ns: int) -> None:
+        """记录项目目录在完整列出并全部处理完毕时的 mtime。"""
+        with closing(_open_processed_db(self.logs_directory)) as conn:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO listed_projects (project, dir_mtime_ns) VALUES (?, ?)",
+                    (project_name, dir_mtime_ns),
+                )
+        self._listed_mtimes[project_name] = dir_mtime_ns
+
+    def mark_processed(self, log_path: str) -> bool:
+        """
+        将日志写入已处理索引并移出队列，同时更新项目最近处理的日志日期。
+        返回 False 表示该日志此前已被标记过。
+        """
+        logs_directory, key = _split_log_path(log_path)
+        project_name, log_filename = entry = os.path.split(key)
+        is_current = logs_directory == self.logs_directory
+
+        if is_current and key in self._processed:
+            return False
+
+        log_date = _log_date(log_filename)
+        with closing(_open_processed_db(logs_directory)) as conn:
+            with conn:
+                result = conn.execute("INSERT OR IGNORE INTO processed (path) VALUES (?)", (key,))
+                if log_date is not None:
+                    conn.execute(
+                        "INSERT INTO last_processed (project, log_date) VALUES (?, ?) "
+                        "ON CONFLICT(project) DO UPDATE SET log_date = MAX(log_date, excluded.log_date)",
+                        (project_name, log_date.isoformat()),
+                    )
+
+        if is_current:
+            self._processed.add(key)
+            if log_date is not None:
+                self._last_dates[project_name] = max(self._last_dates.get(project_name, log_date), log_date)
+            try:
+                self._entries.remove(entry)
+            except ValueError:
+                pass
+        return result.rowcount > 0
+
+
+_LOG_QUEUE = _LogQueue()
+
+
 def get_next_error_log(logs_directory: str) -> Dict[str, str]:
     """
     【新策略】从指定的日志目录中找到下一个尚未处理的错误日志文件。
-    通过检查文件名是否以 '+' 开头来判断日志是否已被处理。
+    已处理的日志记录在日志根目录下的 processed.sqlite 中。
+    目录只在首次调用时扫描一次，之后从 _LOG_QUEUE 中读取。
     """
     if not os.path.isdir(logs_directory):
         return {'status': 'error', 'message': f"Logs directory not found: {logs_directory}"}
 
     try:
-        project_dirs = sorted([d for d in os.listdir(logs_directory) if os.path.isdir(os.path.join(logs_directory, d))])
-    except OSError as e:
+        if _LOG_QUEUE.logs_directory != os.path.abspath(logs_directory):
+            _LOG_QUEUE.refresh(logs_directory)
+        entry = _LOG_QUEUE.peek()
+    except (OSError, sqlite3.Error) as e:
         return {'status': 'error', 'message': f"Error reading logs directory: {e}"}
 
-    for project_name in project_dirs:
-        project_path = os.path.join(logs_directory, project_name)
-        try:
-            log_files = sorted(os.listdir(project_path))
-        except OSError:
-            continue
+    if entry is None:
+        return {'status': 'finished', 'message': 'All logs have been processed.'}
 
-        for log_filename in log_files:
-            # 【核心逻辑】: 跳过以 '+' 开头的文件
-            if log_filename.startswith('+'):
-                continue
-            
-            full_log_path = os.path.join(project_path, log_filename)
-            if "error" in log_filename and os.path.isfile(full_log_path):
-                print(f"--- Tool: Found next log to process: {full_log_path} ---")
-                return {'status': 'success', 'log_path': full_log_path}
-
-    return {'status': 'finished', 'message': 'All logs have been processed.'}
+    project_name, log_filename = entry
+    full_log_path = os.path.join(logs_directory, project_name, log_filename)
+    print(f"--- Tool: Found next log to process: {full_log_path} ---")
+    return {'status': 'success', 'log_path': full_log_path}
 
 
 def mark_log_as_processed_by_rename(log_path: str) -> Dict[str, str]:
     """
-    【新策略】通过在文件名前添加 '+' 来将日志文件标记为已处理。
+    【新策略】将日志文件标记为已处理。
+    不再重命名文件，而是将其路径记录到日志根目录下的 processed.sqlite 中。
+    （保留原函数名，以兼容 Agent 指令中的工具名。）
     """
     if not os.path.isfile(log_path):
         return {'status': 'error', 'message': f"Log file not found at path: {log_path}"}
-    
+
     try:
-        directory = os.path.dirname(log_path)
-        filename = os.path.basename(log_path)
-        
-        # 检查是否已经标记过，避免重复添加 '+'
-        if filename.startswith('+'):
+        if not _LOG_QUEUE.mark_processed(log_path):
             message = f"Log file '{log_path}' is already marked as processed."
             print(f"--- Tool: {message} ---")
             return {'status': 'success', 'message': message}
-            
-        new_filename = '+' + filename
-        new_log_path = os.path.join(directory, new_filename)
-        
-        os.rename(log_path, new_log_path)
-        
-        message = f"Successfully marked log by renaming to '{new_log_path}'."
+
+        message = f"Successfully marked log '{log_path}' as processed."
         print(f"--- Tool: {message} ---")
-        return {'status': 'success', 'message': message, 'new_path': new_log_path}
+        return {'status': 'success', 'message': message}
     except Exception as e:
-        message = f"Failed to mark log by renaming: {e}"
+        message = f"Failed to mark log as processed: {e}"
         print(f"--- Tool ERROR: {message} ---")
         return {'status': 'error', 'message': message}
 
 
+# 返回给 LLM 的文件内容最大长度（字节），避免超出上下文限制
+MAX_READ_LEN = 32000
+# read_and_diff_logs 计算相似度时比较的日志末尾长度（字符）
+DIFF_TAIL_LEN = 4096
+# 日志中的报错行
+_ERROR_LINE_RE = re.compile(r'\b(error|fatal|failed|undefined reference)\b', re.IGNORECASE)
+
+
+def _read_tail(file_path: str, max_len: int = MAX_READ_LEN) -> Tuple[str, bool]:
+    """
+    读取文件末尾最多 max_len 字节并解码，返回 (内容, 是否被截断)。
+    以二进制方式读取后一次性解码，跳过 TextIOWrapper 的逐块解码和换行转换；
+    大文件只 seek 到末尾读取，不把整个文件读入内存。
+    """
+    with open(file_path, "rb") as f:
+        file_size = os.fstat(f.fileno()).st_size
+        is_truncated = file_size > max_len
+        if is_truncated:
+            f.seek(file_size - max_len)
+        data = f.read()
+    return data.decode("utf-8", errors='ignore'), is_truncated
+
+
 def read_file_content(file_path: str) -> dict:
     """
     读取指定文本文件的内容并返回。
@@ -96,13 +360,9 @@ def read_file_content(file_path: str) -> dict:
         message = f"错误：路径 '{file_path}' 不是一个有效的文件。"
         return {"status": "error", "message": message}
     try:
-        with open(file_path, "r", encoding="utf-8", errors='ignore') as f:
-            content = f.read()
-        # 限制返回给LLM的内容长度，避免超出上下文限制
-        MAX_LEN = 32000
-        if len(content) > MAX_LEN:
-            content = content[-MAX_LEN:]
-            message = f"文件 '{file_path}' 内容已成功读取（为避免超长，已截断为最后 {MAX_LEN} 字符）。"
+        content, is_truncated = _read_tail(file_path)
+        if is_truncated:
+            message = f"文件 '{file_path}' 内容已成功读取（为避免超长，已截断为最后 {MAX_READ_LEN} 字节）。"
         else:
             message = f"文件 '{file_path}' 的内容已成功读取。"
         
@@ -112,75 +372,239 @@ def read_file_content(file_path: str) -> dict:
         return {"status": "error", "message": message}
 
 
+def read_and_diff_logs(original_log_path: str, new_log_path: str) -> dict:
+    """
+    一次性读取原始错误日志和新构建日志的末尾内容，并给出简单的比较摘要：
+    - similarity: 两份日志最后 DIFF_TAIL_LEN 个字符按行比较的相似度（0~1）
+    - orig_last_error / new_last_error: 各自最后一条报错行
+    - common_error_lines: 两份日志中都出现的报错行
+    """
+    print(f"--- Tool: read_and_diff_logs called for paths: {original_log_path}, {new_log_path} ---")
+    for file_path in (original_log_path, new_log_path):
+        if not os.path.isfile(file_path):
+            message = f"错误：路径 '{file_path}' 不是一个有效的文件。"
+            return {"status": "error", "message": message}
+    try:
+        orig_tail, orig_truncated = _read_tail(original_log_path)
+        new_tail, new_truncated = _read_tail(new_log_path)
+
+        orig_lines = [line.strip() for line in orig_tail[-DIFF_TAIL_LEN:].splitlines() if line.strip()]
+        new_lines = [line.strip() for line in new_tail[-DIFF_TAIL_LEN:].splitlines() if line.strip()]
+        similarity = difflib.SequenceMatcher(None, orig_lines, new_lines, autojunk=False).ratio()
+
+        orig_errors = [line.strip() for line in orig_tail.splitlines() if _ERROR_LINE_RE.search(line)]
+        new_errors = [line.strip() for line in new_tail.splitlines() if _ERROR_LINE_RE.search(line)]
+        orig_error_set = set(orig_errors)
+        common_error_lines = list(dict.fromkeys(line for line in new_errors if line in orig_error_set))
+
+        message = f"日志 '{original_log_path}' 和 '{new_log_path}' 已成功读取并比较"
+        if orig_truncated or new_truncated:
+            message += f"（为避免超长，内容已截断为最后 {MAX_READ_LEN} 字节）"
+        message += "。"
+
+        return {
+            "status": "success",
+            "message": message,
+            "orig_tail": orig_tail,
+            "new_tail": new_tail,
+            "similarity": round(similarity, 2),
+            "orig_last_error": orig_errors[-1] if orig_errors else "",
+            "new_last_error": new_errors[-1] if new_errors else "",
+            "common_error_lines": common_error_lines[:20],
+        }
+    except Exception as e:
+        message = f"读取或比较日志时发生错误: {str(e)}"
+        return {"status": "error", "message": message}
+
+
+class _ParsedLog(NamedTuple):
+    """parse_error_log 的解析结果（不可变，可安全缓存）。"""
+    project_name: str
+    error_date: str  # 使用 'error_date' 键名更清晰
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_log_path(log_path: str) -> _ParsedLog:
+    """从日志路径中解析项目名称和报错日期，结果按路径缓存。格式不符时抛出 ValueError。"""
+    project_name = os.path.basename(os.path.dirname(log_path))
+    filename = os.path.basename(log_path)
+
+    # 从文件名 "YYYY_M_D error.txt" 或 "YYYY_M_D error" 中提取日期部分
+    date_string = filename.split(' ')[0]
+
+    parts = date_string.split('_')
+    if len(parts) != 3:
+        raise ValueError(f"Date part '{date_string}' is not in 'YYYY_M_D' format.")
+
+    year, month, day = parts
+    return _ParsedLog(project_name=project_name, error_date=f"{year}.{month}.{day}")
+
+
 def parse_error_log(log_path: str) -> Dict[str, str]:
     """
     从给定的错误日志文件路径中解析出项目名称和报错日期。
     """
     print(f"--- Tool: parse_error_log called for path: {log_path} ---")
     try:
-        project_name = os.path.basename(os.path.dirname(log_path))
-        filename = os.path.basename(log_path)
-        
-        # 从文件名 "YYYY_M_D error.txt" 或 "YYYY_M_D error" 中提取日期部分
-        date_string = filename.split(' ')[0]
-        
-        parts = date_string.split('_')
-        if len(parts) != 3:
-            raise ValueError(f"Date part '{date_string}' is not in 'YYYY_M_D' format.")
-        
-        year, month, day = parts
-        error_timestamp = f"{year}.{month}.{day}"
-        
-        return {
-            'status': 'success',
-            'project_name': project_name,
-            'error_date': error_timestamp # 使用 'error_date' 键名更清晰
-        }
+        parsed = _parse_log_path(log_path)
     except Exception as e:
         return {'status': 'error', 'message': f"Failed to parse log path '{log_path}': {e}"}
 
+    return {'status': 'success', **parsed._asdict()}
+
 
-def find_sha_for_timestamp(commits_file_path: str, target_date_str: str) -> Dict[str, str]:
+# github_commits.txt 的解析缓存：日期 -> (当天最早的 commit, 当天最晚的 commit)
+_COMMIT_INDEX: Optional[Dict[date, Tuple[Tuple[datetime, str], Tuple[datetime, str]]]] = None
+# commits 文件中的时间行，如 "Time: 2025.10.24 09:41"（格式固定，直接按字段取整数，无需 strptime）
+_COMMIT_TIME_RE = re.compile(r'Time: (\d{4})\.(\d{1,2})\.(\d{1,2}) (\d{1,2}):(\d{1,2})$')
+# _COMMIT_INDEX 中所有日期的升序列表，用于二分查找目标日期之前的最近一天
+_COMMIT_DATES: List[date] = []
+# 构建缓存时对应的 (文件路径, mtime)，文件被更新后缓存自动失效
+_COMMIT_INDEX_KEY: Optional[Tuple[str, float]] = None
+
+
+def _commit_index_key(commits_file_path: str) -> Tuple[str, float]:
+    """commits 文件的缓存键：(绝对路径, mtime)，文件被更新后随之变化。"""
+    return os.path.abspath(commits_file_path), os.stat(commits_file_path).st_mtime
+
+
+def _load_commit_index(commits_file_path: str) -> Dict[date, Tuple[Tuple[datetime, str], Tuple[datetime, str]]]:
+    """
+    单次流式读取 commits 文件，构建按日期索引的 commit 缓存。
+    文件路径和 mtime 未变化时直接返回已有缓存。
+    """
+    global _COMMIT_INDEX, _COMMIT_DATES, _COMMIT_INDEX_KEY
+
+    cache_key = _commit_index_key(commits_file_path)
+    if _COMMIT_INDEX is not None and _COMMIT_INDEX_KEY == cache_key:
+        return _COMMIT_INDEX
+
+    index: Dict[date, Tuple[Tuple[datetime, str], Tuple[datetime, str]]] = {}
+    with open(commits_file_path, 'r', encoding='utf-8') as f:
+        # 逐对遍历相邻两行（"Time: ..." 与 "- SHA: ..."），不需要把整个文件读入内存
+        for time_line, sha_line in pairwise(f):
+            time_match = _COMMIT_TIME_RE.match(time_line.strip())
+            if time_match is None:
+                continue
+            sha_line = sha_line.strip()
+            if not sha_line.startswith("- SHA: "):
+                continue
+            try:
+                commit_datetime = datetime(*map(int, time_match.groups()))
+            except ValueError:
+                continue
+
+            commit = (commit_datetime, sha_line.replace("- SHA: ", ""))
+            commit_date = commit_datetime.date()
+            if commit_date in index:
+                earliest, latest = index[commit_date]
+                index[commit_date] = (min(earliest, commit), max(latest, commit))
+            else:
+                index[commit_date] = (commit, commit)
+
+    _COMMIT_INDEX = index
+    _COMMIT_DATES = sorted(index)
+    _COMMIT_INDEX_KEY = cache_key
+    return index
+
+
+# 缓存日志对应 commit SHA 的扩展属性名
+SHA_XATTR_NAME = "user.fuzz_sha"
+
+
+def _split_log_path(log_path: str) -> Tuple[str, str]:
+    """返回 (日志根目录, "项目名/文件名")，后者即 processed.sqlite 中使用的路径键。"""
+    log_path = os.path.abspath(log_path)
+    project_dir = os.path.dirname(log_path)
+    return os.path.dirname(project_dir), os.path.join(os.path.basename(project_dir), os.path.basename(log_path))
+
+
+def _get_cached_sha(log_path: str, commits_key: str) -> Optional[str]:
+    """
+    读取缓存在日志文件上的 commit SHA。
+    缓存时使用的 commits 文件（路径与 mtime）与 commits_key 不一致，或没有缓存时返回 None。
+    优先读取扩展属性；文件系统不支持扩展属性时改为查询 processed.sqlite。
+    """
+    try:
+        cached = json.loads(os.getxattr(log_path, SHA_XATTR_NAME))
+        if isinstance(cached, dict) and cached.get("commits_key") == commits_key:
+            return cached.get("sha")
+        return None
+    except AttributeError:
+        pass  # 非 Linux 平台没有 os.getxattr
+    except ValueError:
+        return None
+    except OSError as e:
+        if e.errno != errno.ENOTSUP:
+            return None
+
+    try:
+        logs_directory, key = _split_log_path(log_path)
+        with closing(_open_processed_db(logs_directory)) as conn:
+            row = conn.execute(
+                "SELECT sha FROM log_sha WHERE path = ? AND commits_key = ?", (key, commits_key)
+            ).fetchone()
+        return row[0] if row else None
+    except sqlite3.Error:
+        return None
+
+
+def _cache_sha(log_path: str, sha: str, commits_key: str) -> None:
+    """将 commit SHA 连同所用 commits 文件的 commits_key 缓存到日志文件上，缓存失败不影响调用方。"""
+    try:
+        os.setxattr(log_path, SHA_XATTR_NAME, json.dumps({"sha": sha, "commits_key": commits_key}).encode("utf-8"))
+        return
+    except AttributeError:
+        pass  # 非 Linux 平台没有 os.setxattr
+    except OSError as e:
+        if e.errno != errno.ENOTSUP:
+            print(f"--- Tool WARNING: Failed to cache SHA for '{log_path}': {e} ---")
+            return
+
+    try:
+        logs_directory, key = _split_log_path(log_path)
+        with closing(_open_processed_db(logs_directory)) as conn:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO log_sha (path, sha, commits_key) VALUES (?, ?, ?)",
+                    (key, sha, commits_key),
+                )
+    except sqlite3.Error as e:
+        print(f"--- Tool WARNING: Failed to cache SHA for '{log_path}': {e} ---")
+
+
+def find_sha_for_timestamp(commits_file_path: str, target_date_str: str, log_path: Optional[str] = None) -> Dict[str, str]:
     """
     【新逻辑】在 commits 文件中，为给定的日期找到最合适的 commit SHA。
     逻辑如下：
     1. 如果目标当天有 commit，则返回当天最早的那个。
     2. 如果目标当天没有 commit，则返回在目标日期之前的所有 commit 中，最晚（最新）的那个。
+    commits 文件只在首次调用（或文件被修改）时解析一次，之后直接查询缓存。
+    如果提供了 log_path，找到的 SHA 会连同 commits 文件的路径和 mtime 缓存到该日志文件上，
+    再次处理同一日志且 commits 文件未变化时直接返回。
     """
     print(f"--- Tool: find_sha_for_timestamp (New Logic) called for date: {target_date_str} ---")
+
+    try:
+        commits_key = json.dumps(_commit_index_key(commits_file_path))
+    except FileNotFoundError:
+        return {'status': 'error', 'message': f"Commits file not found at: {commits_file_path}"}
+    except Exception as e:
+        return {'status': 'error', 'message': f"An unexpected error occurred: {e}"}
+
+    if log_path:
+        cached_sha = _get_cached_sha(log_path, commits_key)
+        if cached_sha:
+            print(f"--- Tool: Found cached SHA for log '{log_path}': {cached_sha} ---")
+            return {'status': 'success', 'sha': cached_sha}
     
     try:
         target_date = datetime.strptime(target_date_str, '%Y.%m.%d').date()
     except ValueError:
         return {'status': 'error', 'message': f"Invalid target date format: '{target_date_str}'. Expected 'YYYY.MM.DD'."}
 
-    # 用于存储当天和过去的所有有效 commits
-    todays_commits: List[Tuple[datetime, str]] = []
-    past_commits: List[Tuple[datetime, str]] = []
-
     try:
-        with open(commits_file_path, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-            i = 0
-            while i < len(lines):
-                line = lines[i].strip()
-                if line.startswith("Time: ") and i + 1 < len(lines) and lines[i+1].strip().startswith("- SHA: "):
-                    try:
-                        timestamp_str = line.replace("Time: ", "")
-                        commit_datetime = datetime.strptime(timestamp_str, '%Y.%m.%d %H:%M')
-                        sha = lines[i+1].strip().replace("- SHA: ", "")
-
-                        # --- 【核心逻辑】: 将 commit 分类存储 ---
-                        commit_date = commit_datetime.date()
-                        if commit_date == target_date:
-                            todays_commits.append((commit_datetime, sha))
-                        elif commit_date < target_date:
-                            past_commits.append((commit_datetime, sha))
-                        
-                        i += 2
-                    except (ValueError, IndexError):
-                        pass
-                i += 1
+        index = _load_commit_index(commits_file_path)
     except FileNotFoundError:
         return {'status': 'error', 'message': f"Commits file not found at: {commits_file_path}"}
     except Exception as e:
@@ -188,27 +612,24 @@ def find_sha_for_timestamp(commits_file_path: str, target_date_str: str) -> Dict
 
     # --- 【决策逻辑】 ---
     # 1. 检查当天是否有 commit
-    if todays_commits:
-        # 如果有，找到最早的那个
-        # min() 函数会根据元组的第一个元素（即 datetime 对象）进行比较
-        earliest_today = min(todays_commits)
+    if target_date in index:
+        # 如果有，取当天最早的那个
+        earliest_today = index[target_date][0]
         found_sha = earliest_today[1]
         print(f"--- Tool: Found earliest commit on the same day: {found_sha} at {earliest_today[0].strftime('%Y.%m.%d %H:%M')} ---")
-        return {'status': 'success', 'sha': found_sha}
-    
-    # 2. 如果当天没有，则检查过去是否有 commit
-    elif past_commits:
-        # 如果有，找到最晚（最新）的那个
-        # max() 函数会根据元组的第一个元素（即 datetime 对象）进行比较
-        latest_in_past = max(past_commits)
+    else:
+        # 2. 如果当天没有，则找目标日期之前最近的一天，取那天最晚（最新）的 commit
+        position = bisect_left(_COMMIT_DATES, target_date)
+        if position == 0:
+            # 3. 如果当天和过去都没有任何 commit
+            return {'status': 'error', 'message': f"No suitable SHA found on or before the date {target_date_str}."}
+        latest_in_past = index[_COMMIT_DATES[position - 1]][1]
         found_sha = latest_in_past[1]
         print(f"--- Tool: No commits on target day. Found latest past commit: {found_sha} at {latest_in_past[0].strftime('%Y.%m.%d %H:%M')} ---")
-        return {'status': 'success', 'sha': found_sha}
-        
-    # 3. 如果当天和过去都没有任何 commit
-    else:
-        return {'status': 'error', 'message': f"No suitable SHA found on or before the date {target_date_str}."}
 
+    if log_path:
+        _cache_sha(log_path, found_sha, commits_key)
+    return {'status': 'success', 'sha': found_sha}
 
 
 def checkout_oss_fuzz_commit(oss_fuzz_path: str, sha: str) -> Dict[str, str]:
@@ -219,12 +640,16 @@ def checkout_oss_fuzz_commit(oss_fuzz_path: str, sha: str) -> Dict[str, str]:
     if not os.path.isdir(os.path.join(oss_fuzz_path, ".git")):
         return {'status': 'error', 'message': f"The directory '{oss_fuzz_path}' is not a git repository."}
 
-    original_path = os.getcwd()
     try:
-        os.chdir(oss_fuzz_path)
-        # 先切换到一个已知分支（如master），避免在detached HEAD状态下再次checkout导致的问题
-        subprocess.run(["git", "switch", "master"], capture_output=True, text=True)
-        command = ["git", "checkout", sha]
+        # 一次 rev-parse 同时解析当前 HEAD 和目标 SHA；已经位于目标 commit 时无需 checkout
+        rev_parse = subprocess.run(["git", "-C", oss_fuzz_path, "rev-parse", "HEAD", f"{sha}^{{commit}}"], capture_output=True, text=True, encoding='utf-8')
+        if rev_parse.returncode == 0:
+            head_sha, target_sha = rev_parse.stdout.split()
+            if head_sha == target_sha:
+                return {'status': 'success', 'message': f"Already at SHA {sha}, no checkout needed."}
+
+        # 使用 git -C 指定仓库目录，避免修改进程的工作目录；detached HEAD 状态下也可直接 checkout
+        command = ["git", "-C", oss_fuzz_path, "checkout", sha]
         result = subprocess.run(command, capture_output=True, text=True, encoding='utf-8')
         if result.returncode == 0:
             return {'status': 'success', 'message': f"Successfully checked out SHA {sha}."}
@@ -232,13 +657,51 @@ def checkout_oss_fuzz_commit(oss_fuzz_path: str, sha: str) -> Dict[str, str]:
             return {'status': 'error', 'message': f"Git command failed: {result.stderr.strip()}"}
     except Exception as e:
         return {'status': 'error', 'message': f"An unexpected error occurred during checkout: {e}"}
-    finally:
-        os.chdir(original_path)
+
+
+# 常驻构建 worker：只启动一次 Python 解释器，之后通过 stdin/stdout 逐行收发 JSON 构建请求
+BUILD_WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fuzz_build_worker.py")
+_build_worker: Optional[subprocess.Popen] = None
+
+
+def _stop_build_worker() -> None:
+    """进程退出时关闭 worker 的 stdin，让其处理完当前请求后自行退出。"""
+    if _build_worker is not None and _build_worker.poll() is None:
+        try:
+            _build_worker.stdin.close()
+            _build_worker.wait(timeout=10)
+        except Exception:
+            _build_worker.kill()
+
+
+def _kill_build_worker() -> None:
+    """构建异常时强制结束 worker，其输出可能停在半途，下次调用会重新启动一个干净的 worker。"""
+    global _build_worker
+    if _build_worker is not None:
+        if _build_worker.poll() is None:
+            _build_worker.kill()
+        _build_worker.wait()
+        _build_worker = None
+
+
+def _get_build_worker() -> subprocess.Popen:
+    """返回正在运行的构建 worker，首次调用或 worker 已退出时重新启动。"""
+    global _build_worker
+    if _build_worker is None or _build_worker.poll() is not None:
+        # unregister 再 register，避免 worker 被重置后重复注册
+        atexit.unregister(_stop_build_worker)
+        atexit.register(_stop_build_worker)
+        command = ["python3.10", "-u", BUILD_WORKER_SCRIPT]
+        print(f"--- Starting build worker: {' '.join(command)} ---")
+        _build_worker = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1, encoding='utf-8', errors='ignore')
+    return _build_worker
 
 
 def run_fuzz_build_streaming(project_name: str, oss_fuzz_path: str, sanitizer: str = "address", engine: str = "libfuzzer", architecture: str = "x86_64") -> dict:
     """
     执行 fuzzing 构建命令，并将结果流式传输到日志文件。
+    构建由常驻的 fuzz_build_worker.py 执行，免去每次构建启动解释器的开销。
+    构建结束后，成功时日志改写为 "success"，失败时只保留最后 280 行。
     """
     print(f"--- Tool: run_fuzz_build_streaming called for project: {project_name} ---")
     LOG_DIR = "build_logs"
@@ -246,79 +709,177 @@ def run_fuzz_build_streaming(project_name: str, oss_fuzz_path: str, sanitizer: s
     os.makedirs(LOG_DIR, exist_ok=True)
 
     try:
-        helper_script_path = os.path.join(oss_fuzz_path, "infra/helper.py")
-        command = ["python3.10", helper_script_path, "build_fuzzers", "--sanitizer", sanitizer, "--engine", engine, "--architecture", architecture, project_name]
-        
-        print(f"--- Executing command: {' '.join(command)} ---")
-        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1, cwd=oss_fuzz_path, encoding='utf-8', errors='ignore')
+        request = {
+            "oss_fuzz_path": os.path.abspath(oss_fuzz_path),
+            "project": project_name,
+            "sanitizer": sanitizer,
+            "engine": engine,
+            "architecture": architecture,
+        }
+        worker = _get_build_worker()
+        print(f"--- Sending build request to worker: {json.dumps(request)} ---")
+        worker.stdin.write(json.dumps(request) + "\n")
+        worker.stdin.flush()
 
+        # 构建输出边读边写入日志文件（行缓冲），即使本进程中途崩溃也能保留已有输出；
+        # deque 只保留最后 280 行，用于构建结束后裁剪日志
         log_buffer = deque(maxlen=280)
-        for line in process.stdout:
-            print(line, end='', flush=True)
-            log_buffer.append(line)
-        process.wait()
-
-        if process.returncode == 0:
-            content_to_write = "success"
-            status = "success"
-        else:
-            content_to_write = "".join(log_buffer)
-            status = "error"
-
-        with open(LOG_FILE_PATH, "w", encoding="utf-8") as f:
+        returncode = None
+        with open(LOG_FILE_PATH, "w", encoding="utf-8", buffering=1) as f:
+            def write_line(line: str) -> None:
+                print(line, end='', flush=True)
+                f.write(line)
+                log_buffer.append(line)
+
+            # worker 在结果标记前补了一个换行，暂缓输出空行，以便在其后紧跟标记时丢弃
+            held_blank = False
+            for line in worker.stdout:
+                marker_index = line.find(BUILD_RESULT_MARKER)
+                if marker_index == -1:
+                    if held_blank:
+                        write_line("\n")
+                    held_blank = line == "\n"
+                    if not held_blank:
+                        write_line(line)
+                    continue
+
+                # 构建最后一行输出没有换行时，标记会接在该行末尾，标记前的文本仍属于构建输出
+                returncode = json.loads(line[marker_index + len(BUILD_RESULT_MARKER):])["returncode"]
+                if marker_index > 0:
+                    write_line(line[:marker_index] + "\n")
+                break
+
+            if returncode is None:
+                # 没有收到结果标记，说明 worker 在构建过程中意外退出
+                log_buffer.append(f"Build worker exited unexpectedly with code {worker.wait()}.\n")
+
+            if returncode == 0:
+                content_to_write = "success"
+                status = "success"
+            else:
+                content_to_write = "".join(log_buffer)
+                status = "error"
+
+            f.seek(0)
+            f.truncate()
             f.write(content_to_write)
         
         message = f"Build process finished for {project_name}. Status: {status}. Log saved to '{LOG_FILE_PATH}'."
         return {"status": status, "message": message, "new_build_log_path": LOG_FILE_PATH}
     except Exception as e:
+        _kill_build_worker()
         message = f"An exception occurred during build: {str(e)}"
         with open(LOG_FILE_PATH, "w", encoding="utf-8") as f:
             f.write(message)
         return {"status": "error", "message": message, "new_build_log_path": LOG_FILE_PATH}
 
 
+# 复现结果表格：运行期间逐行写入流式（write_only）工作簿，进程退出时保存为 Excel。
+# 同时逐行追加到 CSV，作为进程异常退出时不丢数据的日志。
+# CSV 是报表的主副本：每行结果先追加到 CSV，进程退出时再由 CSV 的全部内容重新生成 Excel。
+# 若检测到 Excel 比 CSV 新（例如手动编辑过 Excel），启动时先备份 CSV，再以 Excel 为准重建 CSV。
+EXCEL_FILE_PATH = "reproduce_report.xlsx"
+CSV_FILE_PATH = "reproduce_report.csv"
+REPORT_HEADER = ["项目名称", "日期", "归类", "build失败原因", "报错是否一致"]
+
+_report_file = None
+_report_writer = None
+_report_workbook = None
+_report_sheet = None
+
+
+def _read_excel_rows() -> List[list]:
+    """读取已有 Excel 报表中的所有行（含表头），文件不存在时只返回表头。"""
+    if not os.path.exists(EXCEL_FILE_PATH):
+        return [REPORT_HEADER]
+    workbook = openpyxl.load_workbook(EXCEL_FILE_PATH, read_only=True)
+    try:
+        return [list(row) for row in workbook.active.iter_rows(values_only=True)]
+    finally:
+        workbook.close()
+
+
+def _init_writer() -> None:
+    """
+    首次调用时打开 CSV 并创建流式工作簿，注册退出时的保存操作。
+    CSV 不存在，或 Excel 的修改时间晚于 CSV（Excel 被手动编辑过）时，先把已有 Excel 中的
+    数据（或表头）写入 CSV，原 CSV 备份为 .bak；之后把 CSV 中的已有数据（表头只写一次）
+    灌入工作簿，保证保存时数据不丢失。
+    """
+    global _report_file, _report_writer, _report_workbook, _report_sheet
+    if _report_writer is not None:
+        return
+
+    seed_rows = None
+    if not os.path.exists(CSV_FILE_PATH):
+        print(f"--- Tool: CSV file not found. Creating '{CSV_FILE_PATH}' from existing report. ---")
+        seed_rows = _read_excel_rows()
+    elif os.path.exists(EXCEL_FILE_PATH) and os.path.getmtime(EXCEL_FILE_PATH) > os.path.getmtime(CSV_FILE_PATH):
+        backup_path = CSV_FILE_PATH + ".bak"
+        print(f"--- Tool WARNING: '{EXCEL_FILE_PATH}' is newer than '{CSV_FILE_PATH}'. Rebuilding CSV from Excel; old CSV backed up to '{backup_path}'. ---")
+        seed_rows = _read_excel_rows()
+        shutil.copy2(CSV_FILE_PATH, backup_path)
+
+    _report_file = open(CSV_FILE_PATH, "a+" if seed_rows is None else "w+", newline="", encoding="utf-8")
+    _report_writer = csv.writer(_report_file)
+    if seed_rows is not None:
+        _report_writer.writerows(seed_rows)
+        _report_file.flush()
+
+    _report_workbook = Workbook(write_only=True)
+    _report_sheet = _report_workbook.create_sheet()
+    _report_file.seek(0)
+    rows = csv.reader(_report_file)
+    _report_sheet.append(next(rows, REPORT_HEADER))
+    for row in rows:
+        _report_sheet.append(row)
+
+    atexit.register(_save_report_workbook)
+
+
+def _save_report_workbook() -> None:
+    """
+    进程退出时关闭 CSV，并将流式工作簿保存为 Excel。
+    保存成功后把 CSV 的修改时间设为与 Excel 相同，下次启动时不会误判为 Excel 被手动编辑过。
+    """
+    global _report_file, _report_writer, _report_workbook, _report_sheet
+    if _report_file is not None:
+        _report_file.close()
+    workbook = _report_workbook
+    _report_file = _report_writer = _report_workbook = _report_sheet = None
+    if workbook is None:
+        return
+
+    try:
+        workbook.save(EXCEL_FILE_PATH)
+        excel_stat = os.stat(EXCEL_FILE_PATH)
+        os.utime(CSV_FILE_PATH, ns=(excel_stat.st_atime_ns, excel_stat.st_mtime_ns))
+        print(f"--- Tool: Saved reproduce report to '{EXCEL_FILE_PATH}'. ---")
+    except Exception as e:
+        print(f"--- Tool ERROR: Failed to save report to Excel: {e} ---")
+
+
 def update_reproduce_table(project_name: str, date: str, category: str, failure_reason: str, is_consistent: str) -> Dict[str, str]:
     """
-    【新策略】将一行新的复现结果数据写入本地的 Excel (.xlsx) 文件中。
-    如果文件不存在，则会自动创建并写入表头。
+    【新策略】将一行新的复现结果数据追加到流式工作簿和本地的 CSV 文件中。
+    进程退出时会自动将工作簿保存为 Excel (.xlsx) 文件。
     """
     print(f"--- Tool: update_reproduce_table (Local Excel) called for project: {project_name} ---")
-    
-    # 定义输出文件名和表头
-    EXCEL_FILE_PATH = "reproduce_report.xlsx"
-    HEADER = ["项目名称", "日期", "归类", "build失败原因", "报错是否一致"]
 
     try:
-        # 1. 检查文件是否存在，如果不存在则创建并写入表头
-        if not os.path.exists(EXCEL_FILE_PATH):
-            print(f"--- Tool: Excel file not found. Creating '{EXCEL_FILE_PATH}' with headers. ---")
-            # 创建一个新的工作簿
-            workbook = Workbook()
-            # 获取活动工作表
-            sheet = workbook.active
-            # 写入表头
-            sheet.append(HEADER)
-            # 保存文件
-            workbook.save(EXCEL_FILE_PATH)
-
-        # 2. 加载工作簿并追加新数据
-        workbook = openpyxl.load_workbook(EXCEL_FILE_PATH)
-        sheet = workbook.active
-        
-        # 准备要写入的数据行
+        _init_writer()
+
+        # 准备要写入的数据行，追加到 CSV 和工作簿
         data_row = [project_name, date, category, failure_reason, is_consistent]
-        
-        # 追加新行
-        sheet.append(data_row)
-        
-        # 保存更改
-        workbook.save(EXCEL_FILE_PATH)
-        
-        message = f"Successfully wrote data to local Excel file: {EXCEL_FILE_PATH}"
+        _report_writer.writerow(data_row)
+        _report_file.flush()
+        _report_sheet.append(data_row)
+
+        message = f"Successfully wrote data to local report file: {CSV_FILE_PATH}"
         print(f"--- Tool: {message} ---")
         return {'status': 'success', 'message': message}
 
     except Exception as e:
-        message = f"Failed to write to local Excel file: {str(e)}"
+        message = f"Failed to write to local report file: {str(e)}"
         print(f"--- Tool ERROR: {message} ---")
         return {'status': 'error', 'message': message}
@@ -0,0 +1,71 @@
+# fuzz_build_worker.py
+# 常驻的 OSS-Fuzz 构建 worker，由 agent_tools.run_fuzz_build_streaming 启动。
+# 从 stdin 逐行读取 JSON 构建请求，在当前进程内调用 infra/helper.py 的 build_fuzzers，
+# 避免每次构建都重新启动 Python 解释器。
+# 构建输出直接写到 stdout，构建结束后先补一个换行，再输出一行 "RESULT_MARKER {"returncode": N}"，
+# 保证构建最后一行输出没有换行时，结果标记仍位于单独的一行。
+
+import importlib.util
+import json
+import os
+import sys
+
+RESULT_MARKER = "__FUZZ_BUILD_RESULT__"
+
+
+def _load_helper(oss_fuzz_path: str):
+    """
+    重新加载 infra/helper.py。
+    每次构建前 checkout 都可能切换 oss-fuzz 的版本，因此同时清掉已导入的 infra 模块
+    （如 constants、templates），保证使用的是当前版本的代码。
+    """
+    infra_dir = os.path.join(os.path.abspath(oss_fuzz_path), "infra")
+    for name, module in list(sys.modules.items()):
+        module_file = getattr(module, "__file__", None) or ""
+        if module_file.startswith(infra_dir + os.sep):
+            del sys.modules[name]
+    if infra_dir not in sys.path:
+        sys.path.insert(0, infra_dir)
+
+    spec = importlib.util.spec_from_file_location("oss_fuzz_helper", os.path.join(infra_dir, "helper.py"))
+    helper = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(helper)
+    return helper
+
+
+def run_build(request: dict) -> int:
+    """执行一次 build_fuzzers，返回与命令行调用 helper.py 相同的退出码。"""
+    oss_fuzz_path = request["oss_fuzz_path"]
+    helper = _load_helper(oss_fuzz_path)
+    sys.argv = [
+        helper.__file__, "build_fuzzers",
+        "--sanitizer", request["sanitizer"],
+        "--engine", request["engine"],
+        "--architecture", request["architecture"],
+        request["project"],
+    ]
+    os.chdir(oss_fuzz_path)
+    try:
+        return int(helper.main() or 0)
+    except SystemExit as e:
+        if e.code is None:
+            return 0
+        return e.code if isinstance(e.code, int) else 1
+
+
+def main() -> None:
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            returncode = run_build(json.loads(line))
+        except Exception as e:
+            print(f"Build worker error: {e}")
+            returncode = 1
+        sys.stdout.flush()
+        sys.stderr.flush()
+        print(f"\n{RESULT_MARKER} {json.dumps({'returncode': returncode})}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,58 +1,57 @@
-import time
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
-import re
-import tempfile
-import shutil
+import hashlib
+import json
 import os
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor
 
 # 导入timedelta用于时间计算
 from datetime import datetime, timedelta
 
-def parse_page_content(page_html):
+# GitHub REST API 单页最多返回 100 条 commit
+PER_PAGE = 100
+# 并发获取页面的最大线程数
+MAX_CONCURRENCY = 8
+
+# 跨运行保留的页面缓存目录（每页的 ETag 与解析结果），运行结束后不删除
+CACHE_DIR = os.path.expanduser("~/.cache/oss-fuzz-scraper")
+
+# 每个线程各自持有一个 requests.Session
+_thread_local = threading.local()
+
+def _cache_path(api_url, params, page):
+    """根据请求 URL 和参数计算该页在缓存目录中的文件路径。"""
+    query = "&".join(f"{key}={value}" for key, value in sorted(params.items()))
+    cache_key = hashlib.sha256(f"{api_url}?{query}&page={page}".encode('utf-8')).hexdigest()
+    return os.path.join(CACHE_DIR, f"{cache_key}.json")
+
+def parse_page_content(page_json):
     """
-    一个独立的函数，负责解析单个页面的HTML内容并提取时间和SHA。
+    一个独立的函数，负责解析单页 GitHub API 返回的 commit 列表并提取时间和SHA。
     这个函数可以被重复调用，以处理多个页面。
 
     Args:
-        page_html (str): 由Selenium获取的、已完全渲染的页面HTML字符串。
+        page_json (list): `/repos/{owner}/{repo}/commits` 接口返回的 JSON 列表。
 
     Returns:
         list: 一个列表，每个元素都是一个元组 (timestamp, sha)。
     """
 
     page_data = []
-    soup = BeautifulSoup(page_html, 'html.parser')
-
-    main_container = soup.find('div', attrs={'data-target': 'react-app.reactRoot'})
-    if not main_container:
-        print("错误：在当前页面中无法找到根节点 'react-app.reactRoot'。")
-        return []
-
-    all_commits = main_container.find_all('li', attrs={'data-commit-link': True})
 
-    if not all_commits:
-        print("警告：在当前页面中未能找到任何提交项。")
-        return []
-
-    for commit_li in all_commits:
-        commit_link = commit_li.get('data-commit-link')
-        if not commit_link:
+    for commit_item in page_json:
+        sha = commit_item.get('sha')
+        if not sha:
             continue
-        sha = commit_link.split('/')[-1]
 
-        relative_time_tag = commit_li.find('relative-time', attrs={'datetime': True})
-        if not relative_time_tag:
+        commit_info = commit_item.get('commit') or {}
+        author_info = commit_info.get('author') or {}
+        utc_time_str = author_info.get('date')
+        if not utc_time_str:
             continue
 
-        utc_time_str = relative_time_tag['datetime']
-
         try:
-            utc_dt = datetime.strptime(utc_time_str.replace('Z', ''), '%Y-%m-%dT%H:%M:%S.%f')
+            utc_dt = datetime.fromisoformat(utc_time_str.replace('Z', '+00:00'))
             gmt8_offset = timedelta(hours=8)
             gmt8_dt = utc_dt + gmt8_offset
             formatted_timestamp = gmt8_dt.strftime('%Y.%m.%d %H:%M')
@@ -64,108 +63,85 @@ def parse_page_content(page_html):
 
     return page_data
 
-def scrape_github_commits(base_url, pages_to_scrape=10):
-    all_commits_data = []
+def fetch_page(api_url, headers, params, page):
+    """
+    获取并解析单页 commit 数据。每个线程复用自己的 requests.Session。
+    请求时带上缓存的 ETag（If-None-Match），页面未变化时直接使用缓存结果。
+
+    Returns:
+        list | None: 该页的 (timestamp, sha) 列表；请求失败时返回 None。
+    """
+    session = getattr(_thread_local, 'session', None)
+    if session is None:
+        session = requests.Session()
+        session.headers.update(headers)
+        _thread_local.session = session
+
+    # 上次运行保存的该页 ETag 与解析结果；页面未变化时 GitHub 返回 304，直接复用
+    cache_file = _cache_path(api_url, params, page)
+    cached = None
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        pass
+    request_headers = {"If-None-Match": cached["etag"]} if cached else {}
 
-    # 修正后的正确路径
-    chrome_driver_path = "/root/reproduce_note_fuzz/oss-fuzz_information_obtain/chromedriver/chromedriver-linux64/chromedriver"
-    
-    print(f"使用 ChromeDriver 路径: {chrome_driver_path}")
-    
-    # 检查文件是否存在
-    if not os.path.exists(chrome_driver_path):
-        print(f"错误：ChromeDriver 文件不存在: {chrome_driver_path}")
-        return []
-
-    service = Service(chrome_driver_path)
-
-    options = webdriver.ChromeOptions()
-    options.add_argument('--headless')
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
-    options.add_argument('--log-level=3')
-
-    # 解决用户数据目录冲突
-    options.add_argument('--disable-gpu')
-    options.add_argument('--remote-debugging-port=0')
-
-    # 创建临时用户数据目录
-    user_data_dir = tempfile.mkdtemp()
-    options.add_argument(f'--user-data-dir={user_data_dir}')
-
-    print("正在启动 Chrome 浏览器...")
+    print(f"--- 正在获取第 {page} 页 ---")
     try:
-        driver = webdriver.Chrome(service=service, options=options)
-        print("Chrome 浏览器启动成功！")
-    except Exception as e:
-        print(f"启动 Chrome 浏览器失败: {e}")
-        # 清理临时目录
+        response = session.get(api_url, params={**params, "page": page}, headers=request_headers, timeout=30)
+        if response.status_code == 304:
+            print(f"第 {page} 页未变化，使用本地缓存。")
+            return [tuple(item) for item in cached["commits"]]
+        response.raise_for_status()
+    except requests.RequestException as e:
+        print(f"获取第 {page} 页时发生错误: {e}")
+        return None
+
+    page_data = parse_page_content(response.json())
+    etag = response.headers.get("ETag")
+    if etag:
         try:
-            shutil.rmtree(user_data_dir)
-        except:
-            pass
-        return []
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            tmp_file = f"{cache_file}.{threading.get_ident()}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({"etag": etag, "commits": page_data}, f)
+            os.replace(tmp_file, cache_file)
+        except OSError as e:
+            print(f"警告：无法写入缓存文件 {cache_file} - {e}")
 
-    try:
-        # 您的爬虫逻辑保持不变
-        print(f"正在从初始网址爬取数据:\n{base_url}\n")
-        driver.get(base_url)
-        print("正在等待页面所有动态内容加载完成...")
-        WebDriverWait(driver, 50).until(
-            EC.presence_of_element_located((By.XPATH, "//relative-time[text()]"))
-        )
-        print("页面完全渲染完成，正在解析初始页面...")
-
-        initial_html = driver.page_source
-        initial_data = parse_page_content(initial_html)
-
-        if not initial_data:
-            print("错误：未能从初始页面获取任何数据，程序将终止。")
-            return []
-
-        all_commits_data.extend(initial_data)
-        base_sha = initial_data[0][1]
-        print(f"\n获取到用于翻页的基准SHA: {base_sha}")
-
-        for n in range(1, pages_to_scrape + 1):
-            number = 35 * n - 1
-            next_url = f"{base_url}?after={base_sha}+{number}"
-
-            print(f"\n--- 正在爬取第 {n}/{pages_to_scrape} 个后续页面 ---")
-            print(f"URL: {next_url}")
-
-            driver.get(next_url)
-            print("正在等待页面所有动态内容加载完成...")
-            try:
-                WebDriverWait(driver, 30).until(
-                    EC.presence_of_element_located((By.XPATH, "//relative-time[text()]"))
-                )
-                print("页面完全渲染完成，正在解析...")
-
-                page_html = driver.page_source
-                page_data = parse_page_content(page_html)
-
-                if page_data:
-                    all_commits_data.extend(page_data)
-                    print(f"成功获取 {len(page_data)} 条新数据。")
-                else:
-                    print("当前页面没有获取到新数据，可能已到达末页。")
-                    break
-
-            except Exception as page_e:
-                print(f"爬取页面 {next_url} 时发生错误: {page_e}")
-                continue
+    return page_data
 
-    except Exception as e:
-        print(f"\n[严重错误] 发生错误: {e}")
-    finally:
-        print("\n所有爬取任务完成，正在关闭浏览器...")
-        driver.quit()
-        # 清理临时目录
-        try:
-            shutil.rmtree(user_data_dir)
-        except:
-            pass
+def scrape_github_commits(owner, repo, branch="master", pages_to_scrape=10):
+    """
+    通过 GitHub REST API 获取指定仓库分支的 commit 列表。
+    各页通过 page 参数直接定位，最多 MAX_CONCURRENCY 个页面并发获取。
+    如果设置了环境变量 GITHUB_TOKEN，则使用它进行认证以获得更高的速率限制。
+    """
+    all_commits_data = []
+
+    api_url = f"https://api.github.com/repos/{owner}/{repo}/commits"
+    params = {"sha": branch, "per_page": PER_PAGE}
+    headers = {"Accept": "application/vnd.github+json"}
+    token = os.getenv("GITHUB_TOKEN")
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+
+    print(f"正在从 GitHub API 获取数据:\n{api_url}\n")
+    max_workers = max(1, min(MAX_CONCURRENCY, pages_to_scrape))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pages = range(1, pages_to_scrape + 1)
+        results = executor.map(lambda page: fetch_page(api_url, headers, params, page), pages)
+
+        # 按页码顺序合并结果，保证输出仍按时间倒序排列
+        for page, page_data in zip(pages, results):
+            if page_data is None:
+                continue
+            if not page_data:
+                print(f"第 {page} 页没有获取到新数据，可能已到达末页。")
+                break
+            all_commits_data.extend(page_data)
+            print(f"第 {page} 页成功获取 {len(page_data)} 条新数据。")
 
     return all_commits_data
 
@@ -191,10 +167,8 @@ def save_data_to_file(data, filename="github_commits.txt"):
 
 # --- 主程序入口 ---
 if __name__ == "__main__":
-    target_url = "https://github.com/google/oss-fuzz/commits/master/"
-
-    # 调用主函数，除了初始URL，还传入了要额外爬取的页面数
-    final_data = scrape_github_commits(target_url, pages_to_scrape=15)
+    # 调用主函数，传入目标仓库、分支以及要获取的页面数
+    final_data = scrape_github_commits("google", "oss-fuzz", branch="master", pages_to_scrape=15)
 
     if final_data:
         print(f"\n爬取成功！总共获取到 {len(final_data)} 条数据。结果如下：\n" + "=" * 30)
@@ -12,7 +12,7 @@ from agent_tools import (
     find_sha_for_timestamp,
     checkout_oss_fuzz_commit,
     run_fuzz_build_streaming,
-    read_file_content,
+    read_and_diff_logs,
     update_reproduce_table
 )
 
@@ -60,6 +60,7 @@ build_fuzzer_agent = LlmAgent(
     1.  调用 `get_next_error_log` 工具。
     2.  如果工具返回 `status: 'finished'`，你必须立即调用 `exit_loop` 工具，然后你的任务就结束了。
     3.  否则，按顺序调用 `parse_error_log`, `find_sha_for_timestamp`, `checkout_oss_fuzz_commit`, 和 `run_fuzz_build_streaming`。
+        调用 `find_sha_for_timestamp` 时，必须把 `get_next_error_log` 返回的 `log_path` 作为 `log_path` 参数一并传入，以便复用已缓存的 SHA。
     4.  将所有收集到的信息整合为一个JSON字符串作为你的最终输出。
     5.  **【极其重要】** 在输出 JSON 后，你的任务就**绝对结束**了。**不要**进行任何额外的思考，**不要**调用任何其他工具，**不要**对下一步做什么发表任何评论。
     """,
@@ -92,8 +93,8 @@ classify_agent = LlmAgent(
             b. 调用工具后，你的任务就此结束。
 
         - **如果 `status` 是 'error'**:
-            a. 调用 `read_file_content` 两次，读取原始日志和新构建日志。
-            b. 比较日志，判断错误是否一致（'是'或'否'）。
+            a. 调用一次 `read_and_diff_logs` 工具，`original_log_path` 为原始日志路径（JSON 中的 `log_path`），`new_log_path` 为新构建日志路径（JSON 中的 `new_build_log_path`）。它会同时返回两份日志的末尾内容 `orig_tail`、`new_tail`，以及比较摘要 `similarity`、`orig_last_error`、`new_last_error`、`common_error_lines`。
+            b. 结合两份日志内容和比较摘要，判断错误是否一致（'是'或'否'）。
             c. **根据新日志，从下面的列表中选择最贴切的一个子分类**，并总结失败原因。
             d. **【极其重要】** 为 `update_reproduce_table` 工具准备 `category` 参数时，其格式**必须**是**主分类**和**子分类**的组合，中间用换行符 `\n` 分隔。
 
@@ -138,7 +139,7 @@ classify_agent = LlmAgent(
             g. 调用工具后，你的任务就此结束。
     """,
     tools=[
-        read_file_content,
+        read_and_diff_logs,
         update_reproduce_table,
         mark_log_as_processed_by_rename,
     ],